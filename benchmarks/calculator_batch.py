@@ -0,0 +1,89 @@
+"""Compare single-op calculator calls with the batch and expression modes.
+
+Every call goes through the server's JSON-RPC dispatcher (main.process_request),
+so each single-op call pays the per-request tool reload and schema validation.
+Pass --url to send the requests to a running server and include the HTTP round trip.
+
+    python benchmarks/calculator_batch.py [--n 1000] [--url http://localhost:8000/]
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_caller(url):
+    if url:
+        import requests
+        session = requests.Session()
+        return lambda payload: session.post(url, json=payload).json()
+    # main.py loads tools/ and schemas/ relative to the working directory
+    os.chdir(ROOT)
+    sys.path.insert(0, ROOT)
+    import main
+    logging.getLogger("MCPServer").setLevel(logging.ERROR)
+    return main.process_request
+
+
+def call(send, arguments):
+    payload = {"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+               "params": {"name": "calculator", "arguments": arguments}}
+    result = send(payload)["result"]
+    if result.get("isError"):
+        raise RuntimeError(result["content"][0]["text"])
+    return result["structuredContent"]["result"]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=1000, help="number of operands")
+    parser.add_argument("--url", help="JSON-RPC endpoint of a running server")
+    args = parser.parse_args()
+    send = make_caller(args.url)
+    values = [float(i) for i in range(args.n)]
+    prices = [1.5 * i for i in range(args.n)]
+
+    def single_sum():
+        total = 0.0
+        for v in values:
+            total = call(send, {"operation": "add", "a": total, "b": v})
+        return total
+
+    def single_mul():
+        return [call(send, {"operation": "mul", "a": p, "b": v}) for p, v in zip(prices, values)]
+
+    cases = [
+        ("total a column", [
+            (f"{args.n} single 'add' calls", single_sum),
+            ("1 'sum' call", lambda: call(send, {"operation": "sum", "values": values})),
+            ("1 'sum(x)' expression", lambda: call(send, {"expression": "sum(x)", "variables": {"x": values}})),
+        ]),
+        ("multiply two columns", [
+            (f"{args.n} single 'mul' calls", single_mul),
+            ("1 batched 'mul' call", lambda: call(send, {"operation": "mul", "a": prices, "b": values})),
+            ("1 'p * q' expression", lambda: call(send, {"expression": "p * q", "variables": {"p": prices, "q": values}})),
+        ]),
+    ]
+    for title, runs in cases:
+        print(title)
+        results, baseline = [], None
+        for label, fn in runs:
+            value, elapsed = timed(fn)
+            baseline = baseline or elapsed
+            results.append(value)
+            print(f"  {label:<28} {elapsed * 1000:10.1f} ms  {baseline / elapsed:8.1f}x")
+        if any(r != results[0] for r in results[1:]):
+            raise SystemExit(f"  results differ: {[str(r)[:40] for r in results]}")
+
+
+if __name__ == "__main__":
+    main()
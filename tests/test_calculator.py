@@ -0,0 +1,50 @@
+import pytest
+
+from tools import calculator
+
+
+def test_scalar_operations_keep_plain_results():
+    assert calculator.run("add", 1, 2) == {"result": 3}
+    assert calculator.run("div", 1, 0) == {"result": None}
+
+
+def test_batch_operations_broadcast_scalars():
+    assert calculator.run("mul", [1, 2], 10) == {"result": [10.0, 20.0]}
+    assert calculator.run("div", [1, 2], [0, 2]) == {"result": [None, 1.0]}
+    with pytest.raises(ValueError, match="'a' and 'b' must have the same length"):
+        calculator.run("add", [1, 2], [1])
+
+
+def test_aggregates():
+    assert calculator.run("mean", values=[2, 4]) == {"result": 3.0}
+    assert calculator.run("percentile", values=[1, 2, 3, 4], q=50) == {"result": 2.5}
+    assert calculator.run("sum", values=[1e308, 1e308]) == {"result": None}
+
+
+def test_expression_round_accepts_literal_decimals():
+    assert calculator.run(expression="round(x, 2)", variables={"x": [1.234, 2.345]}) == {"result": [1.23, 2.35]}
+
+
+def test_expression_checks_lengths_where_arrays_combine():
+    variables = {"x": [1, 2], "y": [1, 2, 3]}
+    assert calculator.run(expression="sum(x) + y", variables=variables) == {"result": [4.0, 5.0, 6.0]}
+    with pytest.raises(ValueError, match="'x' and 'y' must have the same length"):
+        calculator.run(expression="x + y", variables=variables)
+    with pytest.raises(ValueError, match="'x' and 'y' must have the same length"):
+        calculator.run(expression="min(x, y)", variables=variables)
+
+
+def test_expression_reductions_reject_empty_arrays():
+    with pytest.raises(ValueError, match="'min' requires a non-empty array"):
+        calculator.run(expression="min(x)", variables={"x": []})
+
+
+def test_variables_shadow_constants():
+    assert calculator.run(expression="e * 2", variables={"e": [1, 2]}) == {"result": [2.0, 4.0]}
+    assert calculator.run(expression="pi")["result"] == pytest.approx(3.14159, abs=1e-5)
+
+
+@pytest.mark.parametrize("expression", ["__import__('os')", "x.y", "(lambda: 1)()", "'a'", "abs(x=1)"])
+def test_expression_rejects_unsafe_input(expression):
+    with pytest.raises(ValueError):
+        calculator.run(expression=expression, variables={"x": [1]})
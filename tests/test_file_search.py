@@ -0,0 +1,146 @@
+import os
+import shutil
+from types import SimpleNamespace
+
+import pytest
+
+from tools import file_search
+
+
+PATHS = sorted([
+    "c.py",
+    "x",
+    "a/x",
+    "a/c.py",
+    "a/b/c.py",
+    "a/b/d.txt",
+    "a/Readme.MD",
+    "src/sub/d.py",
+])
+
+
+def search(query, mode="glob", case_sensitive=True, scope="", skip=0, take=100):
+    views = file_search._PathViews(PATHS)
+    lo, hi = file_search._scope_range(views.paths, scope)
+    compiled = file_search._compile_path_query(query, mode, case_sensitive, scope)
+    total, page = views.search(compiled, lo, hi, skip, take)
+    return total, [views.paths[i] for i in page]
+
+
+def names(query, **kwargs):
+    return search(query, **kwargs)[1]
+
+
+def test_glob_to_regex_drops_leading_star_only_when_safe():
+    assert file_search._glob_to_regex("*.py") == "\\.py(?=\n)"
+    assert file_search._glob_to_regex("*") == "/[^/\n]*(?=\n)"
+    assert file_search._glob_to_regex("a/*") == "\n/a/[^/\n]*(?=\n)"
+    assert file_search._glob_to_regex("a/*", "src") == "\n/src/a/[^/\n]*(?=\n)"
+
+
+def test_glob_star_stays_within_one_segment():
+    assert names("a/*.py") == ["a/c.py"]
+    assert names("*/*") == ["a/Readme.MD", "a/c.py", "a/x"]
+    assert names("*") == PATHS
+
+
+def test_glob_double_star_spans_directories():
+    assert names("**/c.py") == ["a/b/c.py", "a/c.py", "c.py"]
+    assert names("a/**/*.py") == ["a/b/c.py", "a/c.py"]
+
+
+def test_glob_character_classes():
+    assert names("[!c]*") == ["a/Readme.MD", "a/b/d.txt", "a/x", "src/sub/d.py", "x"]
+    assert names("[cd].*") == ["a/b/c.py", "a/b/d.txt", "a/c.py", "c.py", "src/sub/d.py"]
+
+
+def test_glob_case_folding():
+    assert names("*.md") == []
+    assert names("*.md", case_sensitive=False) == ["a/Readme.MD"]
+
+
+def test_substring_leading_slash_does_not_match_path_start():
+    assert names("/x", mode="substring") == ["a/x"]
+    assert names("x", mode="substring") == ["a/b/d.txt", "a/x", "x"]
+
+
+def test_regex_is_confirmed_per_path():
+    assert names(r"^a/", mode="regex") == ["a/Readme.MD", "a/b/c.py", "a/b/d.txt", "a/c.py", "a/x"]
+    assert names(r"\.PY$", mode="regex", case_sensitive=False) == ["a/b/c.py", "a/c.py", "c.py", "src/sub/d.py"]
+    assert names(r"c\.py$|^x$", mode="regex") == ["a/b/c.py", "a/c.py", "c.py", "x"]
+
+
+@pytest.mark.parametrize("mode", ["glob", "regex", "substring"])
+def test_empty_query_is_rejected(mode):
+    with pytest.raises(ValueError):
+        file_search._compile_path_query("", mode, True)
+
+
+def test_paging_counts_all_matches():
+    assert search("*.py", skip=1, take=2) == (4, ["a/c.py", "c.py"])
+
+
+@pytest.fixture
+def roots(tmp_path, monkeypatch):
+    """Two small trees indexed by workers that never rescan on their own."""
+    monkeypatch.setattr(file_search, "Observer", None)
+    monkeypatch.setattr(file_search, "RESCAN_SECONDS", 3600)
+    monkeypatch.setattr(file_search, "INDEX_DIR", "")
+    monkeypatch.setattr(file_search, "_INDEXES", {})
+    first, second = tmp_path / "first", tmp_path / "second"
+    for rel in ["src/sub/d.py", "src/e.py", "f.py", "docs/g.txt"]:
+        (first / rel).parent.mkdir(parents=True, exist_ok=True)
+        (first / rel).write_text("hello")
+    for rel in ["h.py", "i.py"]:
+        second.mkdir(exist_ok=True)
+        (second / rel).write_text("world")
+    monkeypatch.setattr(file_search, "SEARCH_ROOTS", [str(first), str(second)])
+    for root in (first, second):
+        assert file_search._get_index(str(root)).ready.wait(5)
+    return first, second
+
+
+def paths_of(result):
+    return [os.path.basename(m["path"]) for m in result["matches"]]
+
+
+def test_run_globs_are_relative_to_path(roots):
+    first, _ = roots
+    assert paths_of(file_search.run("sub/*.py", path=str(first / "src"))) == ["d.py"]
+    assert paths_of(file_search.run("*.py", path=str(first / "src"))) == ["e.py", "d.py"]
+    assert file_search.run("sub/*.py")["total"] == 0
+
+
+def test_run_pages_across_roots(roots):
+    # first: f.py, src/e.py, src/sub/d.py; second: h.py, i.py
+    result = file_search.run("*.py", offset=2, limit=2)
+    assert paths_of(result) == ["d.py", "h.py"]
+    assert (result["total"], result["next_offset"]) == (5, 4)
+    result = file_search.run("*.py", offset=4, limit=2)
+    assert paths_of(result) == ["i.py"]
+    assert result["next_offset"] is None
+
+
+def test_run_rejects_path_outside_roots(roots, tmp_path):
+    with pytest.raises(ValueError):
+        file_search.run("*.py", path=str(tmp_path))
+
+
+def test_deleted_directory_is_removed_from_index(roots):
+    first, _ = roots
+    index = file_search._get_index(str(first))
+    shutil.rmtree(first / "src")
+    (first / "f.py").unlink()
+    index.pending.update([str(first / "src"), str(first / "f.py")])
+    index._apply_pending()
+    assert sorted(index.files) == ["docs/g.txt"]
+
+
+def test_directory_modified_events_are_ignored(roots):
+    first, _ = roots
+    index = file_search._get_index(str(first))
+    handler = file_search._ChangeHandler(index)
+    handler.on_any_event(SimpleNamespace(is_directory=True, event_type="modified", src_path=str(first / "src")))
+    assert index.pending == set()
+    handler.on_any_event(SimpleNamespace(is_directory=False, event_type="modified", src_path=str(first / "f.py")))
+    assert index.pending == {str(first / "f.py")}
@@ -1,17 +1,212 @@
+import ast
+import math
+import operator
+import functools
+from collections import OrderedDict
+import numpy as np
+
 TOOL_METADATA = {
     "name": "calculator",
     "title": "Calculator",
-    "description": "Perform basic arithmetic operations"
+    "description": "Perform arithmetic on numbers or arrays, aggregate arrays (sum, mean, min, max, percentile), or evaluate an arithmetic expression"
+}
+
+BINARY_OPS = {
+    "add": np.add,
+    "sub": np.subtract,
+    "mul": np.multiply,
+    "div": np.divide,
+}
+
+AGGREGATES = {
+    "sum": np.sum,
+    "mean": np.mean,
+    "min": np.min,
+    "max": np.max,
+}
+
+# Operators and functions allowed inside expressions; anything else is rejected.
+_EXPR_BINOPS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.divide,
+    ast.FloorDiv: np.floor_divide,
+    ast.Mod: np.mod,
+    ast.Pow: np.power,
+}
+_EXPR_UNARYOPS = {
+    ast.UAdd: operator.pos,
+    ast.USub: np.negative,
+}
+
+
+def _reduction(name, func):
+    def apply(x, *args):
+        if np.size(x) == 0:
+            raise ValueError(f"Function '{name}' requires a non-empty array")
+        return func(x, *args)
+    return apply
+
+
+def _extremum(name, reduce_func, pairwise_func):
+    """min/max: reduce a single array, or compare several operands element-wise."""
+    reduce_one = _reduction(name, reduce_func)
+    return lambda *args: reduce_one(args[0]) if len(args) == 1 else functools.reduce(pairwise_func, args)
+
+
+# Functions whose operands are combined element-wise and must have matching lengths
+_ELEMENTWISE_FUNCS = {"min", "max"}
+
+_EXPR_FUNCS = {
+    "sum": np.sum,
+    "mean": _reduction("mean", np.mean),
+    "min": _extremum("min", np.min, np.minimum),
+    "max": _extremum("max", np.max, np.maximum),
+    "percentile": _reduction("percentile", np.percentile),
+    "abs": np.abs,
+    "sqrt": np.sqrt,
+    # Literals are floats, but NumPy needs an integer number of decimals
+    "round": lambda x, decimals=0: np.round(x, int(decimals)),
 }
+_EXPR_CONSTANTS = {"pi": math.pi, "e": math.e}
+MAX_EXPRESSION_LENGTH = 1000
+EXPRESSION_CACHE_SIZE = 256
+
+# Module state survives the server's importlib.reload() of tools on every request.
+try:
+    _COMPILED
+except NameError:
+    _COMPILED = OrderedDict()
 
-def run(operation: str, a: float, b: float):
+
+def _scalar(operation: str, a: float, b: float):
     if operation == "add":
-        return {"result": a + b}
+        return a + b
     elif operation == "sub":
-        return {"result": a - b}
+        return a - b
     elif operation == "mul":
-        return {"result": a * b}
-    elif operation == "div":
-        return {"result": a / b if b != 0 else None}
+        return a * b
     else:
-        raise ValueError("Unsupported operation")
+        return a / b if b != 0 else None
+
+
+def _to_output(value):
+    """Convert a NumPy result to JSON, mapping non-finite values (e.g. division by zero) to None."""
+    value = np.asarray(value, dtype=float)
+    if value.ndim == 0:
+        value = float(value)
+        return value if math.isfinite(value) else None
+    return [v if math.isfinite(v) else None for v in value.tolist()]
+
+
+def _compile_node(node):
+    """Turn a parsed expression node into a closure over the variables mapping."""
+    if isinstance(node, ast.Expression):
+        return _compile_node(node.body)
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise ValueError(f"Unsupported constant: {node.value!r}")
+        value = np.float64(node.value)
+        return lambda variables: value
+    if isinstance(node, ast.Name):
+        name = node.id
+        def load(variables):
+            # Caller-supplied variables shadow the built-in constants
+            if name in variables:
+                return variables[name]
+            if name in _EXPR_CONSTANTS:
+                return _EXPR_CONSTANTS[name]
+            raise ValueError(f"Unknown variable: {name}")
+        return load
+    if isinstance(node, ast.BinOp) and type(node.op) in _EXPR_BINOPS:
+        op = _EXPR_BINOPS[type(node.op)]
+        left, right = _compile_node(node.left), _compile_node(node.right)
+        names = (ast.unparse(node.left), ast.unparse(node.right))
+        def binop(variables):
+            operands = (left(variables), right(variables))
+            _check_lengths(dict(zip(names, operands)))
+            return op(*operands)
+        return binop
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _EXPR_UNARYOPS:
+        op = _EXPR_UNARYOPS[type(node.op)]
+        operand = _compile_node(node.operand)
+        return lambda variables: op(operand(variables))
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _EXPR_FUNCS:
+        if node.keywords:
+            raise ValueError("Keyword arguments are not supported in expressions")
+        func = _EXPR_FUNCS[node.func.id]
+        args = [_compile_node(arg) for arg in node.args]
+        if node.func.id in _ELEMENTWISE_FUNCS and len(args) > 1:
+            names = [ast.unparse(arg) for arg in node.args]
+            def call(variables):
+                operands = [arg(variables) for arg in args]
+                _check_lengths(dict(zip(names, operands)))
+                return func(*operands)
+            return call
+        return lambda variables: func(*(arg(variables) for arg in args))
+    raise ValueError(f"Unsupported expression element: {type(node).__name__}")
+
+
+def _compile_expression(expression: str):
+    """Parse and compile an expression, reusing the result for repeated expressions."""
+    compiled = _COMPILED.get(expression)
+    if compiled is not None:
+        _COMPILED.move_to_end(expression)
+        return compiled
+    if len(expression) > MAX_EXPRESSION_LENGTH:
+        raise ValueError("Expression is too long")
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression: {e.msg}")
+    compiled = _COMPILED[expression] = _compile_node(tree)
+    if len(_COMPILED) > EXPRESSION_CACHE_SIZE:
+        _COMPILED.popitem(last=False)
+    return compiled
+
+
+def _check_lengths(arrays: dict):
+    """Reject arrays of different lengths instead of letting NumPy broadcast them."""
+    shapes = {name: np.shape(value) for name, value in arrays.items() if np.ndim(value)}
+    if len(set(shapes.values())) > 1:
+        names = [f"'{name}'" for name in shapes]
+        raise ValueError(f"Arrays {', '.join(names[:-1])} and {names[-1]} must have the same length")
+
+
+def _evaluate(expression: str, variables: dict = None):
+    compiled = _compile_expression(expression)
+    # Lengths are checked where arrays are combined, so sum(x) + y works for any lengths
+    arrays = {name: np.asarray(value, dtype=float) for name, value in (variables or {}).items()}
+    with np.errstate(all="ignore"):
+        return compiled(arrays)
+
+
+def run(operation: str = None, a=None, b=None, values: list = None, q: float = None,
+        expression: str = None, variables: dict = None):
+    if expression is not None:
+        if operation is not None:
+            raise ValueError("Use either 'operation' or 'expression', not both")
+        return {"result": _to_output(_evaluate(expression, variables))}
+    if operation in BINARY_OPS:
+        if a is None or b is None:
+            raise ValueError(f"Operation '{operation}' requires 'a' and 'b'")
+        if not isinstance(a, list) and not isinstance(b, list):
+            return {"result": _scalar(operation, a, b)}
+        # Arrays, with a scalar broadcast against an array
+        left, right = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+        _check_lengths({"a": left, "b": right})
+        with np.errstate(all="ignore"):
+            return {"result": _to_output(BINARY_OPS[operation](left, right))}
+    if operation in AGGREGATES or operation == "percentile":
+        if not values:
+            raise ValueError(f"Operation '{operation}' requires a non-empty 'values' array")
+        data = np.asarray(values, dtype=float)
+        if operation == "percentile":
+            if q is None:
+                raise ValueError("Operation 'percentile' requires 'q' (0-100)")
+            with np.errstate(all="ignore"):
+                return {"result": _to_output(np.percentile(data, q))}
+        with np.errstate(all="ignore"):
+            return {"result": _to_output(AGGREGATES[operation](data))}
+    raise ValueError("Unsupported operation")
@@ -0,0 +1,611 @@
+# tools/file_search.py
+import os
+import re
+import json
+import stat
+import time
+import bisect
+import hashlib
+import threading
+import logging
+import itertools
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # without watchdog, fall back to periodic rescans
+    Observer = None
+    FileSystemEventHandler = object
+
+logger = logging.getLogger("MCPServer")
+
+# Roots to index, separated by os.pathsep (e.g. "/data:/srv/repo").
+SEARCH_ROOTS = [r for r in os.environ.get("FILE_SEARCH_ROOTS", ".").split(os.pathsep) if r]
+# Set to "1" to keep a trigram index of file contents for fast content queries.
+TRIGRAMS_ENABLED = os.environ.get("FILE_SEARCH_TRIGRAMS", "0") == "1"
+# Directory where indexes are persisted between restarts (disabled if empty).
+INDEX_DIR = os.environ.get("FILE_SEARCH_INDEX_DIR", "")
+# Only used when change notifications are unavailable: re-stat the tree this often.
+RESCAN_SECONDS = float(os.environ.get("FILE_SEARCH_RESCAN_SECONDS", "30"))
+MAX_CONTENT_BYTES = 1024 * 1024
+SAVE_INTERVAL = 60
+EVENT_DEBOUNCE = 0.2
+IGNORED_DIRS = {".git", "__pycache__", "node_modules", ".venv", "venv"}
+
+TOOL_METADATA = {
+    "name": "file_search",
+    "title": "File Search",
+    "description": "Search indexed files by glob, regex or substring on paths (or file contents), with paging"
+}
+
+
+def _trigrams(text: str):
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _read_text(path: str):
+    try:
+        with open(path, "rb") as f:
+            data = f.read(MAX_CONTENT_BYTES + 1)
+    except OSError:
+        return None
+    if len(data) > MAX_CONTENT_BYTES or b"\0" in data[:8192]:
+        return None
+    return data.decode("utf-8", errors="ignore")
+
+
+def _read_grams(path: str):
+    text = _read_text(path)
+    return _trigrams(text) if text is not None else None
+
+
+def _to_rel(path: str, root: str) -> str:
+    """Path relative to root, always "/"-separated so queries behave the same on every OS."""
+    rel = os.path.relpath(path, root)
+    return rel.replace(os.sep, "/") if os.sep != "/" else rel
+
+
+def _index_dir():
+    return os.path.abspath(INDEX_DIR) if INDEX_DIR else None
+
+
+def _scope_range(paths, scope: str):
+    """Index range of the sorted paths that lie below scope."""
+    if not scope:
+        return 0, len(paths)
+    prefix = scope + "/"
+    # Everything starting with "a/b/" sorts between "a/b/" and "a/b0"
+    return bisect.bisect_left(paths, prefix), bisect.bisect_left(paths, scope + "0")
+
+
+def _join_lines(paths):
+    starts = [0]
+    for p in paths:
+        starts.append(starts[-1] + len(p) + 2)
+    return "".join("\n/" + p for p in paths) + "\n", starts
+
+
+class _PathViews:
+    """Sorted paths joined into one "\n/<path>" line each, as-is and lower-cased, for C-speed scans.
+
+    The leading "/" lets every glob start with a literal, which the regex engine
+    scans for quickly. Line i starts at starts[i]; starts[-1] is the final "\n".
+    """
+    def __init__(self, paths):
+        self.paths = paths
+        self.blob, self.starts = _join_lines(paths)
+        folded = [p.lower() for p in paths]
+        if folded == paths:
+            self.folded_paths, self.folded_blob, self.folded_starts = paths, self.blob, self.starts
+        else:
+            self.folded_paths = folded
+            self.folded_blob, self.folded_starts = _join_lines(folded)
+
+    def search(self, query, lo: int, hi: int, skip: int, take: int):
+        """Count paths[lo:hi] matching a compiled path query; return (total, indices of the page)."""
+        pattern, folded, per_line = query
+        if folded:
+            paths, blob, starts = self.folded_paths, self.folded_blob, self.folded_starts
+        else:
+            paths, blob, starts = self.paths, self.blob, self.starts
+        # Include the "\n" ending line hi - 1 so trailing (?=\n) lookaheads can see it
+        pos, end = starts[lo], starts[hi] + 1
+        if per_line:
+            # Every match ends at its line's end, so matches and paths correspond 1:1:
+            # count them in C and only locate the lines of the requested page
+            total = len(pattern.findall(blob, pos, end))
+            page = itertools.islice(pattern.finditer(blob, pos, end), skip, skip + take)
+            return total, [bisect.bisect_right(starts, m.start()) - 1 for m in page]
+        if any(a in pattern.pattern for a in ("^", "\\A", "\\Z", "(?<")):
+            # Constructs that see the surrounding line: test each path on its own
+            found = [i for i in range(lo, hi) if pattern.search(paths[i])]
+            return len(found), found[skip:skip + take]
+        # Scan the blob, then confirm each hit against its own path
+        search = pattern.search
+        total, page = 0, []
+        while pos < end:
+            m = search(blob, pos, end)
+            if m is None:
+                break
+            i = bisect.bisect_right(starts, m.start()) - 1
+            if i >= hi:
+                break
+            if search(paths[i]):
+                if skip <= total < skip + take:
+                    page.append(i)
+                total += 1
+            pos = starts[i + 1]
+        return total, page
+
+
+class _ChangeHandler(FileSystemEventHandler):
+    """Collects paths touched by filesystem events for the index worker."""
+    def __init__(self, index):
+        self.index = index
+    def on_any_event(self, event):
+        # A directory's own "modified" event just repeats the file events inside it
+        if event.is_directory and event.event_type not in ("created", "deleted", "moved"):
+            return
+        paths = [event.src_path, getattr(event, "dest_path", None)]
+        with self.index.pending_lock:
+            self.index.pending.update(p for p in paths if p)
+        self.index.changed.set()
+
+
+class _DirectoryIndex:
+    """Index of one root: relative path -> [size, mtime], plus optional trigrams.
+
+    A background worker builds the index and keeps it current; queries never
+    touch the filesystem except to read candidate files for content matches.
+    """
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.files = {}        # rel path -> [size, mtime]
+        self.file_grams = {}   # rel path -> set of trigrams
+        self.postings = {}     # trigram -> set of rel paths
+        # Lookup tables for path queries, rebuilt by the worker after changes
+        self.views = _PathViews([])
+        self.views_stale = False
+        self.lock = threading.Lock()
+        self.pending = set()
+        self.pending_lock = threading.Lock()
+        self.changed = threading.Event()
+        self.ready = threading.Event()
+        self.observer = None
+        self.last_save = 0.0
+        self.dirty = False
+        self.worker = threading.Thread(target=self._run, name=f"file_search:{self.root}", daemon=True)
+        self.worker.start()
+
+    # --- maintenance (worker thread only) ---
+
+    def _run(self):
+        try:
+            self._load()
+            if self.files:
+                self._refresh_views()
+            # Watch before scanning so no change between the two is lost
+            self._start_watching()
+            self._rescan()
+            self._refresh_views()
+            self._save()
+        except Exception as e:
+            logger.error(f"file_search: indexing '{self.root}' failed: {e}")
+        self.ready.set()
+        while True:
+            try:
+                if self.observer is not None and self.observer.is_alive():
+                    if self.changed.wait(SAVE_INTERVAL):
+                        time.sleep(EVENT_DEBOUNCE)
+                        self.changed.clear()
+                        self._apply_pending()
+                else:
+                    time.sleep(RESCAN_SECONDS)
+                    self._rescan()
+                if self.views_stale:
+                    self._refresh_views()
+                if self.dirty and time.time() - self.last_save >= SAVE_INTERVAL:
+                    self._save()
+            except Exception as e:
+                logger.error(f"file_search: updating '{self.root}' failed: {e}")
+
+    def _start_watching(self):
+        if Observer is None:
+            return
+        try:
+            observer = Observer()
+            observer.daemon = True
+            observer.schedule(_ChangeHandler(self), self.root, recursive=True)
+            observer.start()
+            self.observer = observer
+        except Exception as e:
+            logger.warning(f"file_search: watching '{self.root}' failed, using rescans: {e}")
+
+    def _rel(self, path: str):
+        """Relative path of an absolute path, or None if it must not be indexed."""
+        path = os.path.abspath(path)
+        index_dir = _index_dir()
+        if index_dir and (path == index_dir or path.startswith(index_dir + os.sep)):
+            return None
+        rel = _to_rel(path, self.root)
+        if rel == "." or rel.startswith("../"):
+            return None
+        if any(part in IGNORED_DIRS for part in rel.split("/")):
+            return None
+        return rel
+
+    def _walk(self, top: str):
+        """Yield (rel path, size, mtime) for every regular file below top (symlinks skipped)."""
+        index_dir = _index_dir()
+        stack = [top]
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if entry.name not in IGNORED_DIRS and entry.path != index_dir:
+                                    stack.append(entry.path)
+                            elif entry.is_file(follow_symlinks=False):
+                                st = entry.stat(follow_symlinks=False)
+                                yield _to_rel(entry.path, self.root), st.st_size, st.st_mtime
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+    def _is_current(self, rel: str, size: int, mtime: float) -> bool:
+        old = self.files.get(rel)
+        return old is not None and old[0] == size and old[1] == mtime
+
+    def _set_file(self, rel: str, size: int, mtime: float, grams=None):
+        if rel not in self.files:
+            self.views_stale = True
+        self.files[rel] = [size, mtime]
+        if TRIGRAMS_ENABLED:
+            self._unindex_content(rel)
+            if grams is not None:
+                self.file_grams[rel] = grams
+                for g in grams:
+                    self.postings.setdefault(g, set()).add(rel)
+        self.dirty = True
+
+    def _remove_file(self, rel: str):
+        if self.files.pop(rel, None) is not None:
+            self._unindex_content(rel)
+            self.views_stale = True
+            self.dirty = True
+
+    def _unindex_content(self, rel: str):
+        for g in self.file_grams.pop(rel, ()):
+            paths = self.postings.get(g)
+            if paths is not None:
+                paths.discard(rel)
+                if not paths:
+                    del self.postings[g]
+
+    def _indexed_under(self, rel_top: str):
+        """Indexed files below directory rel_top, found by bisecting the sorted views."""
+        if not rel_top:
+            return list(self.files)
+        paths = self.views.paths
+        lo, hi = _scope_range(paths, rel_top)
+        return [rel for rel in paths[lo:hi] if rel in self.files]
+
+    def _sync_subtree(self, top: str, rel_top: str):
+        """Make the index match the directory at top (rel_top == "" for the whole root)."""
+        # Walk and read outside the lock; only the mutations below block queries
+        scanned = {rel: (size, mtime) for rel, size, mtime in self._walk(top)}
+        changed = [rel for rel, (size, mtime) in scanned.items() if not self._is_current(rel, size, mtime)]
+        removed = [rel for rel in self._indexed_under(rel_top) if rel not in scanned]
+        grams = {}
+        if TRIGRAMS_ENABLED:
+            grams = {rel: _read_grams(os.path.join(self.root, rel)) for rel in changed}
+        with self.lock:
+            for rel in removed:
+                self._remove_file(rel)
+            for rel in changed:
+                self._set_file(rel, *scanned[rel], grams.get(rel))
+
+    def _rescan(self):
+        self._sync_subtree(self.root, "")
+
+    def _apply_pending(self):
+        with self.pending_lock:
+            paths, self.pending = self.pending, set()
+        removed_dirs = []
+        for path in paths:
+            rel = self._rel(path)
+            if rel is None:
+                continue
+            try:
+                st = os.lstat(path)
+            except OSError:
+                # Deleted: a file is dropped directly, a directory's files after the loop
+                if rel in self.files:
+                    with self.lock:
+                        self._remove_file(rel)
+                else:
+                    removed_dirs.append(rel)
+                continue
+            if stat.S_ISDIR(st.st_mode):
+                # Only directory create/move events get here; walk the new subtree
+                self._sync_subtree(os.path.join(self.root, rel), rel)
+            elif stat.S_ISREG(st.st_mode):
+                if self._is_current(rel, st.st_size, st.st_mtime):
+                    continue
+                grams = _read_grams(os.path.join(self.root, rel)) if TRIGRAMS_ENABLED else None
+                with self.lock:
+                    self._set_file(rel, st.st_size, st.st_mtime, grams)
+            else:
+                # Symlinks and special files are skipped, as in _walk
+                with self.lock:
+                    self._remove_file(rel)
+        if removed_dirs:
+            # Files indexed since the last rebuild must be visible to the bisect
+            if self.views_stale:
+                self._refresh_views()
+            for rel_dir in removed_dirs:
+                below = self._indexed_under(rel_dir)
+                with self.lock:
+                    for rel in below:
+                        self._remove_file(rel)
+
+    def _refresh_views(self):
+        self.views_stale = False
+        with self.lock:
+            paths = list(self.files)
+        paths.sort()
+        self.views = _PathViews(paths)
+
+    # --- persistence ---
+
+    def _index_file(self):
+        index_dir = _index_dir()
+        if not index_dir:
+            return None
+        digest = hashlib.sha1(self.root.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(index_dir, f"file_search_{digest}.json")
+
+    def _load(self):
+        path = self._index_file()
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"file_search: ignoring unreadable index '{path}': {e}")
+            return
+        if data.get("root") != self.root or data.get("trigrams") != TRIGRAMS_ENABLED:
+            return
+        with self.lock:
+            self.files = data.get("files", {})
+            for rel, grams in data.get("file_grams", {}).items():
+                self.file_grams[rel] = set(grams)
+                for g in grams:
+                    self.postings.setdefault(g, set()).add(rel)
+
+    def _save(self):
+        path = self._index_file()
+        self.last_save = time.time()
+        self.dirty = False
+        if not path:
+            return
+        data = {"root": self.root, "trigrams": TRIGRAMS_ENABLED, "files": self.files}
+        if TRIGRAMS_ENABLED:
+            data["file_grams"] = {rel: sorted(g) for rel, g in self.file_grams.items()}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    # --- queries ---
+
+    def search_paths(self, query, scope: str, skip: int, take: int):
+        """Count paths under scope matching query; return (total, rel paths of the page)."""
+        views = self.views
+        lo, hi = _scope_range(views.paths, scope)
+        total, page = views.search(query, lo, hi, skip, take)
+        return total, [views.paths[i] for i in page]
+
+    def search_content(self, pattern, literal: str, scope: str, skip: int, take: int):
+        """Match file contents under scope, stopping once the page is full and one more match is seen.
+
+        Returns (total, rel paths of the page, exact); total is a lower bound when exact is False.
+        """
+        paths = self.views.paths
+        lo, hi = _scope_range(paths, scope)
+        if TRIGRAMS_ENABLED and literal and len(literal) >= 3:
+            with self.lock:
+                candidates = None
+                for g in _trigrams(literal):
+                    found = self.postings.get(g, set())
+                    candidates = set(found) if candidates is None else candidates & found
+                    if not candidates:
+                        return 0, [], True
+            prefix = scope + "/" if scope else ""
+            candidates = sorted(rel for rel in candidates if rel.startswith(prefix))
+        else:
+            candidates = paths[lo:hi]
+        total, page = 0, []
+        for rel in candidates:
+            if TRIGRAMS_ENABLED and rel not in self.file_grams:
+                continue  # binary or oversized
+            text = _read_text(os.path.join(self.root, rel))
+            if text is None or not pattern.search(text):
+                continue
+            if total >= skip + take:
+                return total + 1, page, False
+            if total >= skip:
+                page.append(rel)
+            total += 1
+        return total, page, True
+
+
+# Module state survives the server's importlib.reload() of tools on every request.
+try:
+    _INDEXES
+except NameError:
+    _INDEXES = {}
+    _INDEXES_LOCK = threading.Lock()
+
+
+def _get_index(root: str) -> _DirectoryIndex:
+    root = os.path.abspath(root)
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(root)
+        if index is None:
+            # Only starts the worker; the index is built in the background
+            index = _INDEXES[root] = _DirectoryIndex(root)
+    return index
+
+
+_GLOB_STARS = ("[^/\n]*", "[^\n]*")
+
+
+def _glob_tokens(query: str):
+    """Split a glob into regex pieces; '*' and '?' stay within one path segment, '**' spans segments."""
+    tokens, i, n = [], 0, len(query)
+    while i < n:
+        c = query[i]
+        if query.startswith("**/", i):
+            tokens.append("(?:[^\n]*/)?")
+            i += 3
+            continue
+        if query.startswith("**", i):
+            tokens.append("[^\n]*")
+            i += 2
+            continue
+        if c == "*":
+            tokens.append("[^/\n]*")
+        elif c == "?":
+            tokens.append("[^/\n]")
+        elif c == "[":
+            j = i + 1
+            if j < n and query[j] == "!":
+                j += 1
+            if j < n and query[j] == "]":
+                j += 1
+            j = query.find("]", j)
+            if j == -1:
+                tokens.append("\\[")
+            else:
+                body = query[i + 1:j].replace("\\", "\\\\").replace("[", "\\[")
+                if body.startswith("!"):
+                    tokens.append("[^/\n" + body[1:] + "]")
+                else:
+                    tokens.append("[" + ("\\" + body if body.startswith("^") else body) + "]")
+                i = j + 1
+                continue
+        else:
+            tokens.append(re.escape(c))
+        i += 1
+    return tokens
+
+
+def _glob_to_regex(query: str, scope: str = "") -> str:
+    """Regex matching whole "\n/<path>" lines of _PathViews.blob that satisfy the glob.
+
+    Globs with a directory part are relative to scope. Leading wildcards are
+    dropped where that keeps the meaning, so the pattern starts with a literal
+    the regex engine can scan for instead of backtracking.
+    """
+    tokens = _glob_tokens(query)
+    if "/" not in query:
+        # Patterns without a directory part match against the file name only.
+        # "*x" / "**x" just need x to reach the end of the line within the name.
+        if tokens and tokens[0] in _GLOB_STARS and any(t not in _GLOB_STARS for t in tokens):
+            return "".join(tokens[1:]) + "(?=\n)"
+        return "/" + "".join(tokens) + "(?=\n)"
+    if scope:
+        return "\n/" + re.escape(scope + "/") + "".join(tokens) + "(?=\n)"
+    if tokens and tokens[0] == "(?:[^\n]*/)?":
+        # "**/x" matches x after any "/", including the one in front of every path
+        return "/" + "".join(tokens[1:]) + "(?=\n)"
+    return "\n/" + "".join(tokens) + "(?=\n)"
+
+
+def _compile_path_query(query: str, mode: str, case_sensitive: bool, scope: str = ""):
+    """Return (pattern, runs on lower-cased paths, matches consume exactly one line)."""
+    if not query:
+        raise ValueError("Query must not be empty")
+    if mode == "regex":
+        # Paths are scanned one per line, so $ keeps its per-path meaning
+        if case_sensitive:
+            return re.compile(query, re.MULTILINE), False, False
+        if not re.search(r"\\[A-Z]", query):
+            # Without escapes like \D or \S, lower-casing the pattern and the paths is
+            # equivalent to re.IGNORECASE and much faster
+            return re.compile(query.lower(), re.MULTILINE), True, False
+        return re.compile(query, re.MULTILINE | re.IGNORECASE), False, False
+    if mode not in ("glob", "substring"):
+        raise ValueError("Unsupported mode. Use 'glob', 'regex' or 'substring'.")
+    # Case-insensitive queries run on the lower-cased blob, which is much faster than re.IGNORECASE
+    folded = not case_sensitive
+    if folded:
+        query, scope = query.lower(), scope.lower()
+    if "\n" in query:
+        source = "(?!)"  # can never match a single path
+    elif mode == "glob":
+        source = _glob_to_regex(query, scope)
+    else:
+        # Consume the rest of the line so each path counts once; a leading "/" must not
+        # match the separator in front of every path
+        source = ("(?<!\n)" if query.startswith("/") else "") + re.escape(query) + "[^\n]*"
+    return re.compile(source), folded, True
+
+
+def _compile_content_query(query: str, mode: str, case_sensitive: bool):
+    if not query:
+        raise ValueError("Query must not be empty")
+    flags = 0 if case_sensitive else re.IGNORECASE
+    if mode == "glob":
+        raise ValueError("Glob mode only applies to paths, not file contents")
+    if mode == "regex":
+        return re.compile(query, flags)
+    if mode == "substring":
+        return re.compile(re.escape(query), flags)
+    raise ValueError("Unsupported mode. Use 'glob', 'regex' or 'substring'.")
+
+
+def _scopes(path: str = None):
+    """Resolve which (root, sub-path) pairs a query covers."""
+    roots = [os.path.abspath(r) for r in SEARCH_ROOTS]
+    if not path:
+        return [(r, "") for r in roots]
+    target = os.path.abspath(path)
+    for r in roots:
+        if target == r or target.startswith(r + os.sep):
+            return [(r, _to_rel(target, r) if target != r else "")]
+    raise ValueError(f"Path '{path}' is not inside a configured search root")
+
+
+def run(query: str, mode: str = "glob", path: str = None, content: bool = False,
+        case_sensitive: bool = False, offset: int = 0, limit: int = 100):
+    if content:
+        pattern = _compile_content_query(query, mode, case_sensitive)
+    literal = query if mode == "substring" else None
+    total, matches, exact, indexing = 0, [], True, False
+    for root, scope in _scopes(path):
+        index = _get_index(root)
+        indexing = indexing or not index.ready.is_set()
+        skip, take = max(0, offset - total), limit - len(matches)
+        if content:
+            found, page, exact = index.search_content(pattern, literal, scope, skip, take)
+        else:
+            path_query = _compile_path_query(query, mode, case_sensitive, scope)
+            found, page = index.search_paths(path_query, scope, skip, take)
+        total += found
+        # Result entries are only built for the requested page
+        for rel in page:
+            size, mtime = index.files.get(rel, (0, 0.0))
+            matches.append({"path": os.path.join(root, rel), "size": size, "mtime": mtime})
+        if not exact:
+            break
+    next_offset = offset + len(matches) if offset + len(matches) < total else None
+    return {"matches": matches, "total": total, "total_exact": exact,
+            "next_offset": next_offset, "indexing": indexing}